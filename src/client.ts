@@ -0,0 +1,117 @@
+import {
+  APIErrorCode,
+  APIResponseError,
+  Client,
+  RequestTimeoutError,
+  UnknownHTTPResponseError,
+} from "@notionhq/client";
+import https from "https";
+
+const MAX_RETRIES = 5;
+const INITIAL_BACKOFF_MS = 1000;
+const RETRYABLE_NETWORK_ERRORS = new Set(["ECONNRESET", "ETIMEDOUT", "EPIPE"]);
+// Notion allows an average of three requests per second per integration,
+// so request starts are spaced at least this far apart, while the number of
+// requests in flight stays bounded for slow responses
+const MIN_REQUEST_INTERVAL_MS = 334;
+const MAX_IN_FLIGHT = 3;
+
+let inFlight = 0;
+const waiting: (() => void)[] = [];
+// earliest time the next request may start
+let nextStart = 0;
+
+// a single keep-alive agent lets consecutive API calls reuse the same TLS
+// connection to api.notion.com instead of handshaking for every request
+const agent = new https.Agent({ keepAlive: true });
+
+function isRetryable(error: unknown): boolean {
+  if (APIResponseError.isAPIResponseError(error)) {
+    return (
+      error.code === APIErrorCode.RateLimited ||
+      error.code === APIErrorCode.InternalServerError ||
+      error.code === APIErrorCode.ServiceUnavailable
+    );
+  }
+  // gateway errors such as 502 and 504 carry no Notion error code
+  if (UnknownHTTPResponseError.isUnknownHTTPResponseError(error)) {
+    return error.status >= 500;
+  }
+  if (RequestTimeoutError.isRequestTimeoutError(error)) return true;
+  // node-fetch reports dropped connections, e.g. a reused keep-alive socket
+  // closed by the server, as a FetchError carrying the system error code
+  return (
+    error instanceof Error &&
+    error.name === "FetchError" &&
+    RETRYABLE_NETWORK_ERRORS.has((error as { code?: string }).code ?? "")
+  );
+}
+
+function getRetryDelay(error: unknown, attempt: number): number {
+  const backoff = INITIAL_BACKOFF_MS * 2 ** attempt;
+  let delay = backoff;
+  // rate limited responses tell how many seconds to wait before retrying
+  if (APIResponseError.isAPIResponseError(error)) {
+    const retryAfter = Number(error.headers.get("retry-after")) * 1000;
+    if (retryAfter > delay) delay = retryAfter;
+  }
+  // jitter keeps pages rendered concurrently from retrying in lockstep
+  return Math.round(delay + Math.random() * backoff * 0.25);
+}
+
+async function limited<T>(callback: () => Promise<T>): Promise<T> {
+  if (inFlight < MAX_IN_FLIGHT) inFlight++;
+  else await new Promise<void>((resolve) => waiting.push(resolve));
+  try {
+    // reserve a start time before waiting, so concurrent callers queue up
+    // one interval apart instead of all waking at the same moment
+    const now = Date.now();
+    const start = Math.max(now, nextStart);
+    nextStart = start + MIN_REQUEST_INTERVAL_MS;
+    if (start > now)
+      await new Promise((resolve) => setTimeout(resolve, start - now));
+    return await callback();
+  } finally {
+    // hand the slot straight to the next waiting request, if any
+    const next = waiting.shift();
+    if (next) next();
+    else inFlight--;
+  }
+}
+
+async function withRetry<T>(callback: () => Promise<T>): Promise<T> {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await limited(callback);
+    } catch (error) {
+      if (attempt >= MAX_RETRIES || !isRetryable(error)) throw error;
+      const delay = getRetryDelay(error, attempt);
+      console.warn(
+        `[Warn] ${(error as Error).message}, retrying in ${delay}ms`
+      );
+      await new Promise((resolve) => setTimeout(resolve, delay));
+    }
+  }
+}
+
+function createClient(): Client {
+  const client = new Client({
+    auth: process.env.NOTION_TOKEN,
+    agent,
+  });
+  // every endpoint, including the ones notion-to-markdown calls, goes through
+  // client.request, so a transient error only repeats the failed call
+  // instead of failing the whole sync
+  const request = client.request.bind(client);
+  client.request = ((args) =>
+    withRetry(() => request(args))) as Client["request"];
+  return client;
+}
+
+let sharedClient: Client | undefined;
+
+// the config loader and the sync loop share one client for the whole run
+export function getClient(): Client {
+  sharedClient ??= createClient();
+  return sharedClient;
+}
@@ -1,4 +1,5 @@
-import { Client, isFullBlock, iteratePaginatedAPI } from "@notionhq/client";
+import { isFullBlock, iteratePaginatedAPI } from "@notionhq/client";
+import { getClient } from "./client";
 
 const userDefinedConfig = require('../notion-hugo.config')
 
@@ -30,7 +31,16 @@ export type Config = {
   formatter: Formatter;
 };
 
-export async function loadConfig(): Promise<Config> {
+let loadedConfig: Promise<Config> | undefined
+
+// the config is read for every rendered page, but it cannot change during a
+// run, so build it (and list the mounted page when mount.manual is false) once
+export function loadConfig(): Promise<Config> {
+  loadedConfig ??= buildConfig()
+  return loadedConfig
+}
+
+async function buildConfig(): Promise<Config> {
   const userConfig = userDefinedConfig as UserConfig
   const config: Config = {
     mount: {
@@ -55,9 +65,7 @@ export async function loadConfig(): Promise<Config> {
     if (len < 32)
       throw Error(`[Error] The page_url ${url.href} is invalid`)
     const pageId = url.pathname.slice(len - 32, len)
-    const notion = new Client({
-      auth: process.env.NOTION_TOKEN,
-    });
+    const notion = getClient();
   
     for await (const block of iteratePaginatedAPI(notion.blocks.children.list, {
       block_id: pageId
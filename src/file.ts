@@ -3,7 +3,7 @@ import fs from "fs";
 import path from "path";
 import fm from "front-matter";
 
-type ContentFile = {
+export type ContentFile = {
   filename: string;
   // relative path to the project folder
   filepath: string;
@@ -12,55 +12,107 @@ type ContentFile = {
   expiry_time: string | null | undefined;
 };
 
+const HEAD_CHUNK_SIZE = 16 * 1024
+
 function isMarkdownFile(filename: string): boolean {
   return filename.endsWith(".md");
 }
 
-export function getContentFile(filepath: string): ContentFile | undefined {
-  if (!fs.existsSync(filepath)) return undefined
-  const filedata = fm(fs.readFileSync(filepath, 'utf-8'))
-  const metadata = (filedata.attributes as any).NOTION_METADATA
-  if (metadata) {
-    return {
-      filename: path.basename(filepath),
-      filepath,
-      metadata,
-      expiry_time: (filedata.attributes as any).EXPIRY_TIME
+const BOM = Buffer.from([0xef, 0xbb, 0xbf])
+const OPENING_DELIMITER = Buffer.from('---')
+const CLOSING_DELIMITERS = ['\n---\n', '\n---\r\n']
+// a closing delimiter split across two reads starts at most this many bytes
+// before the new ones
+const DELIMITER_OVERLAP = 5
+
+function findFrontMatterEnd(head: Buffer, from: number): number {
+  // look for the earliest closing delimiter at or after from
+  let end = -1
+  for (const delimiter of CLOSING_DELIMITERS) {
+    const index = head.indexOf(delimiter, from)
+    if (index !== -1 && (end === -1 || index + delimiter.length < end))
+      end = index + delimiter.length
+  }
+  return end
+}
+
+// only the front matter is needed here, so stop reading once it is complete
+// instead of loading the whole post body
+function readFrontMatter(filepath: string): string {
+  const fd = fs.openSync(filepath, 'r')
+  try {
+    const chunks: Buffer[] = []
+    let length = 0
+    while (true) {
+      const chunk = Buffer.allocUnsafe(HEAD_CHUNK_SIZE)
+      const bytesRead = fs.readSync(fd, chunk, 0, HEAD_CHUNK_SIZE, null)
+      if (bytesRead === 0) break
+      const data = chunk.subarray(0, bytesRead)
+      let window: Buffer
+      let from: number
+      if (length === 0) {
+        const start = data.subarray(0, BOM.length).equals(BOM) ? BOM.length : 0
+        // no front matter at all, there is nothing to look for in the rest
+        if (!data.subarray(start, start + OPENING_DELIMITER.length).equals(OPENING_DELIMITER))
+          return data.toString('utf-8')
+        // skip the opening delimiter
+        window = data
+        from = start + OPENING_DELIMITER.length
+      } else {
+        // only search the new bytes, plus enough of the previous ones to
+        // catch a delimiter split across the two reads
+        const last = chunks[chunks.length - 1]
+        const overlap = Math.min(DELIMITER_OVERLAP, last.length)
+        window = Buffer.concat([last.subarray(last.length - overlap), data])
+        from = 0
+      }
+      const windowStart = length - (window.length - data.length)
+      chunks.push(data)
+      length += data.length
+      const end = findFrontMatterEnd(window, from)
+      if (end !== -1)
+        return Buffer.concat(chunks, length).subarray(0, windowStart + end).toString('utf-8')
     }
-  } else {
-    console.warn(`[Warn] ${filepath} does not have NOTION_METADATA in its front matter`)
+    return Buffer.concat(chunks, length).toString('utf-8')
+  } finally {
+    fs.closeSync(fd)
+  }
+}
+
+function parseContentFile(filepath: string): ContentFile | undefined {
+  const attributes = fm(readFrontMatter(filepath)).attributes as any
+  if (!attributes.NOTION_METADATA) {
+    console.warn(`[Warn] ${filepath} does not have NOTION_METADATA in its front matter, it will not be managed.`)
     return undefined
   }
+  return {
+    filename: path.basename(filepath),
+    filepath,
+    metadata: attributes.NOTION_METADATA,
+    expiry_time: attributes.EXPIRY_TIME
+  }
 }
 
 export function getAllContentFiles(
   dirPath: string,
 ): ContentFile[] {
   const fileArray: ContentFile[] = []
+  const files: string[] = []
   const queue: string[] = [dirPath]
   while (queue.length !== 0) {
-    const filepath = queue.shift()
-    if (filepath === undefined) continue
-    if (fs.statSync(filepath).isDirectory()) {
-      const files = fs.readdirSync(filepath)
-      for (const file of files) {
-        queue.push(path.join(filepath, file))
-      }
-      continue
-    }
-    if (!isMarkdownFile(filepath)) continue
-    const filedata = fm(fs.readFileSync(filepath, 'utf-8'))
-    const metadata = (filedata.attributes as any).NOTION_METADATA
-    if (metadata) {
-      fileArray.push({
-        filename: path.basename(filepath),
-        filepath,
-        metadata,
-        expiry_time: (filedata.attributes as any).expiry_time
-      })
-    } else {
-      console.warn(`[Warn] ${filepath} does not have NOTION_METADATA in its front matter, it will not be managed.`)
+    const dir = queue.pop()
+    if (dir === undefined) continue
+    // dirents already carry the entry type, only symlinks need a stat call
+    for (const entry of fs.readdirSync(dir, { withFileTypes: true })) {
+      const filepath = path.join(dir, entry.name)
+      const stats = entry.isSymbolicLink() ? fs.statSync(filepath) : entry
+      if (stats.isDirectory()) queue.push(filepath)
+      else if (isMarkdownFile(entry.name)) files.push(filepath)
     }
   }
+  for (const filepath of files) {
+    const file = parseContentFile(filepath)
+    if (file) fileArray.push(file)
+  }
   return fileArray
 }
@@ -1,8 +1,10 @@
-import { Client, isFullPage } from "@notionhq/client";
 import {
   PageObjectResponse
 } from "@notionhq/client/build/src/api-endpoints";
 
+// runs of spaces and dashes in a title, collapsed into one dash in file names
+const SEPARATOR_RUN = /[ -]+/g;
+
 export function getPageTitle(page: PageObjectResponse): string {
   const title = page.properties.Name ?? page.properties.title;
   if (title.type === "title") {
@@ -13,12 +15,9 @@ export function getPageTitle(page: PageObjectResponse): string {
   );
 }
 
-export async function getCoverLink(
-  page_id: string,
-  notion: Client
-): Promise<{link: string, expiry_time: string | null} | null> {
-  const page = await notion.pages.retrieve({ page_id });
-  if (!isFullPage(page)) return null;
+export function getCoverLink(
+  page: PageObjectResponse
+): {link: string, expiry_time: string | null} | null {
   if (page.cover === null) return null;
   if (page.cover.type === "external") return {
     link: page.cover.external.url,
@@ -31,7 +30,24 @@ export async function getCoverLink(
 }
 
 export function getFileName(title: string, page_id: string): string {
-  return title.replaceAll(" ", "-").replace(/--+/g, "-") +
+  return title.replace(SEPARATOR_RUN, "-") +
   "-" +
   page_id.replaceAll("-", "") + '.md';
-}
\ No newline at end of file
+}
+
+export async function forEachConcurrent<T>(
+  items: T[],
+  limit: number,
+  callback: (item: T) => Promise<void>
+): Promise<void> {
+  let next = 0;
+  const workers = Array.from(
+    { length: Math.min(limit, items.length) },
+    async () => {
+      while (next < items.length) {
+        await callback(items[next++]);
+      }
+    }
+  );
+  await Promise.all(workers);
+}
@@ -1,53 +1,70 @@
-import { Client, isFullPage, iteratePaginatedAPI } from "@notionhq/client";
+import { isFullPage, iteratePaginatedAPI } from "@notionhq/client";
 import dotenv from "dotenv";
 import fs from "fs-extra";
 import { savePage } from "./render";
-import { loadConfig } from "./config";
+import { DatabaseMount, loadConfig, PageMount } from "./config";
+import { getClient } from "./client";
 import { getAllContentFiles } from "./file";
+import { forEachConcurrent } from "./helpers";
 import { isFullPageOrDatabase } from "@notionhq/client/build/src/helpers";
+import { PageObjectResponse } from "@notionhq/client/build/src/api-endpoints";
 
 dotenv.config();
 
+// number of pages rendered at the same time
+const PAGE_CONCURRENCY = 4;
+
 async function main() {
-  if (process.env.NOTION_TOKEN === "")
-    throw Error("The NOTION_TOKEN environment vairable is not set.");
+  if (!process.env.NOTION_TOKEN)
+    throw Error("The NOTION_TOKEN environment variable is not set.");
   const config = await loadConfig();
   console.info("[Info] Config loaded ");
 
-  const notion = new Client({
-    auth: process.env.NOTION_TOKEN,
-  });
+  const notion = getClient();
 
-  const page_ids: string[] = [];
+  const page_ids = new Set<string>();
+  const tasks: { page: PageObjectResponse; mount: DatabaseMount | PageMount }[] = [];
 
   console.info("[Info] Start processing mounted databases");
-  // process mounted databases
-  for (const mount of config.mount.databases) {
-    fs.ensureDirSync(`content/${mount.target_folder}`);
-    for await (const page of iteratePaginatedAPI(notion.databases.query, {
-      database_id: mount.database_id,
-    })) {
-      if (!isFullPageOrDatabase(page) || page.object !== "page") {
-        continue;
+  // every mount is an independent listing, so fetch them all at the same time
+  await Promise.all([
+    // collect pages in mounted databases
+    ...config.mount.databases.map(async (mount) => {
+      fs.ensureDirSync(`content/${mount.target_folder}`);
+      for await (const page of iteratePaginatedAPI(notion.databases.query, {
+        database_id: mount.database_id,
+      })) {
+        if (!isFullPageOrDatabase(page) || page.object !== "page") {
+          continue;
+        }
+        page_ids.add(page.id);
+        tasks.push({ page, mount });
       }
-      console.info(`[Info] Start processing page ${page.id}`);
-      page_ids.push(page.id);
-      await savePage(page, notion, mount);
-    }
-  }
+    }),
+    // collect mounted pages
+    ...config.mount.pages.map(async (mount) => {
+      const page = await notion.pages.retrieve({ page_id: mount.page_id });
+      if (!isFullPage(page)) return;
+      page_ids.add(page.id);
+      tasks.push({ page, mount });
+    }),
+  ]);
 
-  // process mounted pages
-  for (const mount of config.mount.pages) {
-    const page = await notion.pages.retrieve({ page_id: mount.page_id });
-    if (!isFullPage(page)) continue;
-    page_ids.push(page.id);
-    await savePage(page, notion, mount);
-  }
+  // scan local posts once, for both the up-to-date check and the cleanup
+  const contentFiles = getAllContentFiles("content");
+  const posts = new Map(
+    contentFiles.map((file) => [file.filepath, file] as const)
+  );
+
+  // rendering a page is bound by Notion API round trips, so keep several in flight
+  await forEachConcurrent(tasks, PAGE_CONCURRENCY, async ({ page, mount }) => {
+    console.info(`[Info] Start processing page ${page.id}`);
+    await savePage(page, notion, mount, posts);
+  });
 
   // remove posts that exist locally but not in Notion Database
-  const contentFiles = getAllContentFiles("content");
   for (const file of contentFiles) {
-    if (!page_ids.includes(file.metadata.id)) {
+    if (!page_ids.has(file.metadata.id)) {
       fs.removeSync(file.filepath);
     }
   }
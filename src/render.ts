@@ -1,24 +1,21 @@
 import fs from "fs-extra";
 import {
   Client,
-  isFullPage,
   isFullUser,
   iteratePaginatedAPI,
 } from "@notionhq/client";
 import {
   EquationBlockObjectResponse,
-  GetPageResponse,
   PageObjectResponse,
 } from "@notionhq/client/build/src/api-endpoints";
 import { NotionToMarkdown } from "@pclouddev/notion-to-markdown";
 import YAML from "yaml";
-import { sh } from "./sh";
 import { DatabaseMount, loadConfig, PageMount } from "./config";
 import { getPageTitle, getCoverLink, getFileName } from "./helpers";
 import katex from "katex";
 import { MdBlock } from "@pclouddev/notion-to-markdown/build/types";
 import path from "path";
-import { getContentFile } from "./file";
+import { ContentFile } from "./file";
 require("katex/contrib/mhchem"); // modify katex module
 
 function getExpiryTime(blocks: MdBlock[], expiry_time: string | undefined = undefined): string | undefined {
@@ -38,11 +35,79 @@ function getExpiryTime(blocks: MdBlock[], expiry_time: string | undefined = unde
   return expiry_time
 }
 
+type PageProperty = PageObjectResponse["properties"][string];
+
+// people, rich_text, relation and title values are truncated in the page
+// object and array rollups are paginated; only people, rich_text and array
+// rollups end up in the front matter, so only those go through the paginated
+// property endpoint. the fetch and the front matter mapping both use this
+// test so they always agree
+function isPaginatedProperty(property: PageProperty): boolean {
+  return (
+    property.type === "people" ||
+    property.type === "rich_text" ||
+    (property.type === "rollup" && property.rollup.type === "array")
+  );
+}
+
+// fetch every item of the paginated properties, all concurrently
+async function getPaginatedPropertyItems(
+  page: PageObjectResponse,
+  notion: Client
+) {
+  const entries = await Promise.all(
+    Object.values(page.properties)
+      .filter(isPaginatedProperty)
+      .map(async (property) => {
+        const items = [];
+        for await (const item of iteratePaginatedAPI(
+          // @ts-ignore
+          notion.pages.properties.retrieve,
+          {
+            page_id: page.id,
+            property_id: property.id,
+          }
+        )) {
+          items.push(item);
+        }
+        return [property.id, items] as const;
+      })
+  );
+  return new Map(entries);
+}
+
+// most pages are edited by the same few people, so look each one up once per
+// run; the promise is stored so concurrent pages share one in-flight request
+const userNames = new Map<string, Promise<string | null>>();
+
+function getUserName(user_id: string, notion: Client): Promise<string | null> {
+  let name = userNames.get(user_id);
+  if (name === undefined) {
+    name = notion.users.retrieve({ user_id }).then((user) => user.name);
+    userNames.set(user_id, name);
+  }
+  return name;
+}
+
+// rendered KaTeX html keyed by the equation source, shared by all pages
+const equationCache = new Map<string, string>();
+
+function renderEquation(expression: string): string {
+  let html = equationCache.get(expression);
+  if (html === undefined) {
+    html = katex.renderToString(expression, {
+      throwOnError: false,
+      displayMode: true,
+    });
+    equationCache.set(expression, html);
+  }
+  return html;
+}
+
 export async function renderPage(page: PageObjectResponse, notion: Client) {
 
   // load formatter config
   const formatterConfig = (await loadConfig()).formatter;
-  formatterConfig.equation.style
 
   const n2m = new NotionToMarkdown({ notionClient: notion });
   let frontInjectString = ''
@@ -63,11 +128,7 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
     case 'html':
       n2m.setCustomTransformer("equation", async (block) => {
         const { equation } = block as EquationBlockObjectResponse;
-        const html = katex.renderToString(equation.expression, {
-          throwOnError: false,
-          displayMode: true,
-        });
-        return html;
+        return renderEquation(equation.expression);
       });
       frontInjectString += `<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/katex@0.16.2/dist/katex.min.css" integrity="sha384-bYdxxUwYipFNohQlHt0bjN/LCpueqWz13HufFEV1SUatKs1cm4L6fFgCi1jT643X" crossorigin="anonymous">\n`
       break
@@ -77,11 +138,15 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
   }
 
   let nearest_expiry_time: string | null = null
-  const mdblocks = await n2m.pageToMarkdown(page.id);
+  // the paginated property values do not depend on the page blocks,
+  // so fetch both at the same time
+  const [mdblocks, propertyItems] = await Promise.all([
+    n2m.pageToMarkdown(page.id),
+    getPaginatedPropertyItems(page, notion),
+  ]);
   const page_expiry_time = getExpiryTime(mdblocks)
   if (page_expiry_time) nearest_expiry_time = page_expiry_time
   const mdString = n2m.toMarkdownString(mdblocks);
-  page.properties.Name;
   const title = getPageTitle(page);
   const frontMatter: Record<
     string,
@@ -94,7 +159,7 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
   };
 
   // set featuredImage
-  const featuredImageLink = await getCoverLink(page.id, notion);
+  const featuredImageLink = getCoverLink(page);
   if (featuredImageLink) {
     const { link, expiry_time } = featuredImageLink;
     frontMatter.featuredImage = link;
@@ -110,12 +175,8 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
 
   // map page properties to front matter
   for (const property in page.properties) {
-    const id = page.properties[property].id;
-    const response = await notion.pages.properties.retrieve({
-      page_id: page.id,
-      property_id: id,
-    });
-    if (response.object === "property_item") {
+    const response = page.properties[property];
+    if (!isPaginatedProperty(response)) {
       switch (response.type) {
         case "checkbox":
           frontMatter[property] = response.checkbox;
@@ -162,14 +223,7 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
           break;
       }
     } else {
-      for await (const result of iteratePaginatedAPI(
-        // @ts-ignore
-        notion.pages.properties.retrieve,
-        {
-          page_id: page.id,
-          property_id: id,
-        }
-      )) {
+      for (const result of propertyItems.get(response.id) ?? []) {
         switch (result.type) {
           case "people":
             frontMatter[property] = frontMatter[property] || [];
@@ -195,11 +249,9 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
 
   // set default author
   if (frontMatter.authors == null) {
-    const response = await notion.users.retrieve({
-      user_id: page.last_edited_by.id,
-    });
-    if (response.name) {
-      frontMatter.authors = [response.name];
+    const name = await getUserName(page.last_edited_by.id, notion);
+    if (name) {
+      frontMatter.authors = [name];
     }
   }
 
@@ -230,14 +282,13 @@ export async function renderPage(page: PageObjectResponse, notion: Client) {
 export async function savePage(
   page: PageObjectResponse,
   notion: Client,
-  mount: DatabaseMount | PageMount
+  mount: DatabaseMount | PageMount,
+  // local posts keyed by file path
+  posts: Map<string, ContentFile>
 ) {
-  const postpath = path.join(
-    "content",
-    mount.target_folder,
-    getFileName(getPageTitle(page), page.id)
-  );
-  const post = getContentFile(postpath);
+  const fileName = getFileName(getPageTitle(page), page.id);
+  const postpath = path.join("content", mount.target_folder, fileName);
+  const post = posts.get(postpath);
   if (post) {
     const metadata = post.metadata;
     // if the page is not modified, continue
@@ -249,11 +300,7 @@ export async function savePage(
   // otherwise update the page
   console.info(`[Info] Updating ${postpath}`);
 
-  const { title, pageString } = await renderPage(page, notion);
-  const fileName = getFileName(title, page.id);
-  await sh(
-    `hugo new "${mount.target_folder}/${fileName}"`,
-    false
-  );
-  fs.writeFileSync(`content/${mount.target_folder}/${fileName}`, pageString);
+  const { pageString } = await renderPage(page, notion);
+  await fs.ensureDir(path.dirname(postpath));
+  await fs.writeFile(postpath, pageString);
 }